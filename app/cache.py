@@ -0,0 +1,296 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Dict, Tuple
+
+from .config import get_settings
+from .llm import RIVERWOOD_SYSTEM_PROMPT, generate_response
+from .memory import redis_client
+
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+# Devanagari -> Latin, close to how callers type Hinglish ("kya", "plot", "kitne")
+_VOWELS = {
+	"अ": "a", "आ": "aa", "इ": "i", "ई": "i", "उ": "u", "ऊ": "u", "ऋ": "ri",
+	"ए": "e", "ऐ": "ai", "ओ": "o", "औ": "au",
+}
+_MATRAS = {
+	"ा": "aa", "ि": "i", "ी": "i", "ु": "u", "ू": "u", "ृ": "ri",
+	"े": "e", "ै": "ai", "ो": "o", "ौ": "au", "ॉ": "o", "ॅ": "e",
+}
+_CONSONANTS = {
+	"क": "k", "ख": "kh", "ग": "g", "घ": "gh", "ङ": "n",
+	"च": "ch", "छ": "chh", "ज": "j", "झ": "jh", "ञ": "n",
+	"ट": "t", "ठ": "th", "ड": "d", "ढ": "dh", "ण": "n",
+	"त": "t", "थ": "th", "द": "d", "ध": "dh", "न": "n",
+	"प": "p", "फ": "ph", "ब": "b", "भ": "bh", "म": "m",
+	"य": "y", "र": "r", "ल": "l", "व": "v", "श": "sh", "ष": "sh", "स": "s", "ह": "h",
+}
+_SIGNS = {"ं": "n", "ँ": "n", "ः": "h", "्": ""}
+_DIGITS = {chr(0x0966 + i): str(i) for i in range(10)}
+
+# Common spelling variants collapse to one form (keys and values already vowel/schwa folded)
+_SPELLINGS = {
+	"kia": "kya", "hain": "hai", "hein": "hai",
+	"nahin": "nahi", "nai": "nahi", "kitna": "kitne", "kitni": "kitne",
+	"plots": "plot", "meter": "meters", "mtr": "meters", "sqm": "sq meters",
+	"scheme": "yojna",
+}
+
+# Discourse fillers only; anything that can carry meaning ("na", "to", "he") stays
+_FILLERS = {
+	"um", "umm", "uh", "uhh", "hmm", "hm", "acha", "accha", "achha",
+	"ji", "jee", "han", "ok", "okay", "please", "plz", "bhai", "sir", "madam",
+	"toh", "zara", "jara", "mujhe", "batao", "bataiye", "bataye", "bata",
+	"namaste", "hello", "arey", "arre", "yaar",
+}
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_SPACE_RE = re.compile(r"\s+")
+_LONG_VOWEL_RE = re.compile(r"(a|i|u)\1+")
+# Word-medial schwa: vowel + consonant + "a" + consonant + vowel drops the "a" ("kitane" -> "kitne")
+_CONS = r"[b-df-hj-np-tv-z]"
+_SCHWA_RE = re.compile(rf"([aeiou](?:{_CONS}h|{_CONS}))a(?={_CONS}h?[aeiou])")
+
+
+def _transliterate(text: str) -> str:
+	out: List[str] = []
+	# Drop nukta so "ज़"/"फ़" fold onto their base consonants
+	chars = unicodedata.normalize("NFD", text).replace("\u093c", "")
+	chars = unicodedata.normalize("NFC", chars)
+	for i, ch in enumerate(chars):
+		if ch in _CONSONANTS:
+			out.append(_CONSONANTS[ch])
+			nxt = chars[i + 1] if i + 1 < len(chars) else ""
+			# Inherent "a" unless a matra/virama follows or the word ends
+			if nxt and nxt not in _MATRAS and nxt != "्" and not nxt.isspace() and nxt not in "।?!.,":
+				out.append("a")
+		elif ch in _MATRAS:
+			out.append(_MATRAS[ch])
+		elif ch in _VOWELS:
+			out.append(_VOWELS[ch])
+		elif ch in _SIGNS:
+			out.append(_SIGNS[ch])
+		elif ch in _DIGITS:
+			out.append(_DIGITS[ch])
+		elif ch == "।":
+			out.append(" ")
+		else:
+			out.append(ch)
+	return "".join(out)
+
+
+def _fold_word(word: str) -> str:
+	# Applied to both scripts so "योजना" and "yojana" meet at "yojna"
+	word = _LONG_VOWEL_RE.sub(r"\1", word)
+	return _SCHWA_RE.sub(r"\1", word)
+
+
+def normalize_utterance(text: str) -> str:
+	"""Fold an utterance so that trivially different phrasings share a cache key."""
+	folded = _transliterate(text).lower()
+	folded = _PUNCT_RE.sub(" ", folded)
+	words: List[str] = []
+	for word in _SPACE_RE.split(folded):
+		if not word:
+			continue
+		word = _fold_word(word)
+		word = _SPELLINGS.get(word, word)
+		if word in _FILLERS:
+			continue
+		words.append(word)
+	return " ".join(words)
+
+
+def _prompt_fingerprint() -> str:
+	# Entries carry rendered audio, so a voice change must invalidate them too
+	model = settings.grok_model if settings.llm_provider == "grok" else settings.gemini_model
+	voice = settings.elevenlabs_voice_id if settings.tts_provider == "elevenlabs" else settings.edge_voice
+	raw = f"{settings.llm_provider}:{model}:{settings.tts_provider}:{voice}:{RIVERWOOD_SYSTEM_PROMPT}"
+	return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+_PROMPT_FINGERPRINT = _prompt_fingerprint()
+
+
+def cache_key(user_text: str) -> str | None:
+	normalized = normalize_utterance(user_text)
+	if not normalized:
+		return None
+	digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:32]
+	return f"llmcache:{_PROMPT_FINGERPRINT}:{digest}"
+
+
+@dataclass
+class CachedReply:
+	text: str
+	audio_path: str | None = None
+
+
+class ResponseCache:
+	"""In-process LRU with TTL, backed by an optional shared Redis tier."""
+
+	def __init__(self, max_entries: int, ttl_seconds: int) -> None:
+		self.max_entries = max_entries
+		self.ttl_seconds = ttl_seconds
+		self._entries: "OrderedDict[str, Tuple[float, CachedReply]]" = OrderedDict()
+		self._lock = threading.Lock()
+		self.hits = 0
+		self.misses = 0
+		self.redis_hits = 0
+		self.saved_llm_seconds = 0.0
+		self.saved_tts_seconds = 0.0
+		self._miss_latency_total = 0.0
+		self._synth_latency_total = 0.0
+		self._synth_count = 0
+
+	def get(self, key: str) -> CachedReply | None:
+		now = time.monotonic()
+		with self._lock:
+			item = self._entries.get(key)
+			if item is not None:
+				expires_at, reply = item
+				if expires_at > now:
+					self._entries.move_to_end(key)
+					return reply
+				self._entries.pop(key, None)
+		reply = self._redis_get(key)
+		if reply is not None:
+			with self._lock:
+				self.redis_hits += 1
+			self._local_put(key, reply)
+		return reply
+
+	def peek(self, key: str) -> CachedReply | None:
+		"""Local-tier lookup that skips Redis and leaves LRU order and stats alone."""
+		with self._lock:
+			item = self._entries.get(key)
+			if item is not None and item[0] > time.monotonic():
+				return item[1]
+		return None
+
+	def put(self, key: str, reply: CachedReply) -> None:
+		self._local_put(key, reply)
+		self._redis_put(key, reply)
+
+	def _local_put(self, key: str, reply: CachedReply) -> None:
+		with self._lock:
+			self._entries[key] = (time.monotonic() + self.ttl_seconds, reply)
+			self._entries.move_to_end(key)
+			while len(self._entries) > self.max_entries:
+				self._entries.popitem(last=False)
+
+	def _redis_get(self, key: str) -> CachedReply | None:
+		if not redis_client:
+			return None
+		try:
+			raw = redis_client.get(key)
+			if not raw:
+				return None
+			data = json.loads(raw)
+			return CachedReply(text=data["text"], audio_path=data.get("audio_path"))
+		except Exception as e:
+			logger.warning(f"Response cache Redis read failed: {e}")
+			return None
+
+	def _redis_put(self, key: str, reply: CachedReply) -> None:
+		if not redis_client:
+			return
+		try:
+			payload = json.dumps({"text": reply.text, "audio_path": reply.audio_path})
+			redis_client.set(key, payload, ex=self.ttl_seconds)
+		except Exception as e:
+			logger.warning(f"Response cache Redis write failed: {e}")
+
+	def record_hit(self, elapsed: float, with_audio: bool) -> None:
+		# Savings are estimated from observed averages, so nothing is credited before a baseline exists
+		with self._lock:
+			self.hits += 1
+			if self.misses:
+				avg_miss = self._miss_latency_total / self.misses
+				self.saved_llm_seconds += max(avg_miss - elapsed, 0.0)
+			if with_audio and self._synth_count:
+				self.saved_tts_seconds += self._synth_latency_total / self._synth_count
+
+	def record_miss(self, elapsed: float) -> None:
+		with self._lock:
+			self.misses += 1
+			self._miss_latency_total += elapsed
+
+	def record_synthesis(self, elapsed: float) -> None:
+		with self._lock:
+			self._synth_count += 1
+			self._synth_latency_total += elapsed
+
+	def stats(self) -> Dict[str, float | int]:
+		with self._lock:
+			lookups = self.hits + self.misses
+			return {
+				"entries": len(self._entries),
+				"hits": self.hits,
+				"misses": self.misses,
+				"redis_hits": self.redis_hits,
+				"hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+				"avg_miss_latency_ms": round(self._miss_latency_total / self.misses * 1000, 1) if self.misses else 0.0,
+				"avg_synthesis_ms": round(self._synth_latency_total / self._synth_count * 1000, 1) if self._synth_count else 0.0,
+				"saved_llm_ms": round(self.saved_llm_seconds * 1000, 1),
+				"saved_tts_ms": round(self.saved_tts_seconds * 1000, 1),
+				"saved_latency_ms": round((self.saved_llm_seconds + self.saved_tts_seconds) * 1000, 1),
+			}
+
+
+response_cache = ResponseCache(
+	max_entries=settings.response_cache_max_entries,
+	ttl_seconds=settings.response_cache_ttl_seconds,
+)
+
+
+def _cacheable(history: List[Dict[str, str]]) -> bool:
+	# Only first turns: once there is history the reply depends on it
+	return settings.response_cache_enabled and not history
+
+
+def cached_generate_response(history: List[Dict[str, str]], user_text: str) -> CachedReply:
+	"""generate_response() for a new user turn, served from the cache when the turn has no history."""
+	messages = history + [{"role": "user", "content": user_text}]
+	key = cache_key(user_text) if _cacheable(history) else None
+	if key is None:
+		return CachedReply(text=generate_response(messages))
+
+	started = time.perf_counter()
+	cached = response_cache.get(key)
+	if cached is not None:
+		if cached.audio_path and not os.path.exists(cached.audio_path):
+			# Audio rendered on another instance or already cleaned up
+			cached = CachedReply(text=cached.text)
+		response_cache.record_hit(time.perf_counter() - started, with_audio=bool(cached.audio_path))
+		logger.info(f"Response cache hit for '{normalize_utterance(user_text)}'")
+		return cached
+
+	reply_text = generate_response(messages)
+	response_cache.record_miss(time.perf_counter() - started)
+	if reply_text:
+		response_cache.put(key, CachedReply(text=reply_text))
+	return CachedReply(text=reply_text)
+
+
+def remember_audio(history: List[Dict[str, str]], user_text: str, reply_text: str, audio_path: str) -> None:
+	"""Attach rendered TTS audio to a cached reply so repeat questions skip synthesis."""
+	key = cache_key(user_text) if _cacheable(history) else None
+	if key is None:
+		return
+	cached = response_cache.peek(key)
+	if cached is None or cached.text != reply_text or cached.audio_path == audio_path:
+		return
+	response_cache.put(key, CachedReply(text=reply_text, audio_path=audio_path))
+
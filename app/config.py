@@ -33,6 +33,8 @@ class Settings:
 	edge_voice: str = os.getenv("EDGE_VOICE", "en-IN-NeerjaNeural")
 	elevenlabs_api_key: str | None = os.getenv("ELEVENLABS_API_KEY")
 	elevenlabs_voice_id: str = os.getenv("ELEVENLABS_VOICE_ID", "21m00Tcm4TlvDq8ikWAM")
+	twilio_audio_profile: str = os.getenv("TWILIO_AUDIO_PROFILE", "telephony")  # telephony | mp3
+	browser_audio_profile: str = os.getenv("BROWSER_AUDIO_PROFILE", "mp3")  # used when Accept names no audio type
 
 	# Redis (Upstash)
 	upstash_redis_url: str | None = os.getenv("UPSTASH_REDIS_REST_URL")
@@ -40,6 +42,19 @@ class Settings:
 	redis_ttl_seconds: int = int(os.getenv("REDIS_TTL_SECONDS", "86400"))
 	max_history_messages: int = int(os.getenv("MAX_HISTORY_MESSAGES", "20"))
 
+	# Response cache (first-turn questions)
+	response_cache_enabled: bool = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+	response_cache_max_entries: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+	response_cache_ttl_seconds: int = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "21600"))
+
+	# Turn pipeline deadlines (seconds); together they stay under Twilio's 15 s webhook timeout
+	stt_timeout_seconds: float = float(os.getenv("STT_TIMEOUT_SECONDS", "5"))
+	history_timeout_seconds: float = float(os.getenv("HISTORY_TIMEOUT_SECONDS", "2"))
+	llm_timeout_seconds: float = float(os.getenv("LLM_TIMEOUT_SECONDS", "4"))
+	tts_timeout_seconds: float = float(os.getenv("TTS_TIMEOUT_SECONDS", "3"))
+	transcode_timeout_seconds: float = float(os.getenv("TRANSCODE_TIMEOUT_SECONDS", "2"))
+	disconnect_poll_seconds: float = float(os.getenv("DISCONNECT_POLL_SECONDS", "0.5"))
+
 	# Files
 	media_dir: str = os.getenv("MEDIA_DIR", "media")
 
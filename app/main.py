@@ -14,10 +14,10 @@ import base64
 import tempfile
 
 from .config import get_settings
-from .stt import transcribe_from_url
-from .llm import generate_response
-from .memory import load_history, append_message
-from .tts import synthesize
+from .stt import transcribe_from_url, transcribe_file
+from .cache import response_cache
+from .turn import run_turn, TurnCancelled
+from .tts import negotiate_profile, media_type_for
 from .twilio_utils import validate_twilio_signature
 
 
@@ -46,6 +46,11 @@ def health() -> dict:
 	return {"status": "ok"}
 
 
+@app.get("/cache/stats")
+def cache_stats() -> dict:
+	return response_cache.stats()
+
+
 def _public_url(path: str, request: Request | None = None) -> str:
 	base = settings.api_base_url or ""
 	if base:
@@ -108,38 +113,29 @@ async def process_recording(request: Request) -> str:
 		vr.redirect("/voice")
 		return str(vr)
 
-	# STT
 	try:
-		user_text = transcribe_from_url(recording_url, language="hi")
-	except Exception:
-		user_text = ""
+		turn = await run_turn(
+			call_sid,
+			lambda: transcribe_from_url(recording_url, language="hi"),
+			fallback_reply="Namaste! Aapki baat samajh aayi. Thodi der baad phir se koshish karte hain.",
+			audio_profile=settings.twilio_audio_profile,
+			is_disconnected=request.is_disconnected,
+		)
+	except TurnCancelled:
+		return str(VoiceResponse())
 
-	if not user_text:
+	if not turn.user_text:
 		vr.say("Mujhe theek se sunai nahin diya. Kripya dobara kahe.", voice="alice", language="en-IN")
 		vr.redirect("/voice")
 		return str(vr)
 
-	# Memory + LLM
-	history = load_history(call_sid)
-	append_message(call_sid, "user", user_text)
-	reply_text = ""
-	try:
-		reply_text = generate_response(history + [{"role": "user", "content": user_text}])
-	except Exception:
-		reply_text = "Namaste! Aapki baat samajh aayi. Thodi der baad phir se koshish karte hain."
-
-	append_message(call_sid, "assistant", reply_text)
-
-	# TTS -> file
-	try:
-		audio_path = await synthesize(reply_text)
-	except Exception:
+	if not turn.audio_path:
 		# Fallback to Twilio TTS if synthesis fails
-		vr.say(reply_text, voice="alice", language="en-IN")
+		vr.say(turn.reply_text, voice="alice", language="en-IN")
 		vr.redirect("/voice")
 		return str(vr)
 
-	filename = os.path.basename(audio_path)
+	filename = os.path.basename(turn.audio_path)
 	play_url = _public_url(f"/media/{filename}", request=request)
 	vr.play(play_url)
 	vr.redirect("/voice")
@@ -149,7 +145,7 @@ async def process_recording(request: Request) -> str:
 @app.get("/media/{filename}")
 async def media(filename: str):
 	path = os.path.join(settings.media_dir, filename)
-	return FileResponse(path, media_type="audio/mpeg")
+	return FileResponse(path, media_type=media_type_for(path))
 
 
 @app.post("/client-voice", response_class=PlainTextResponse, include_in_schema=False)
@@ -241,6 +237,7 @@ async def direct_page():
 
 @app.post("/direct/stt-llm-tts")
 async def direct_stt_llm_tts(
+	request: Request,
 	audio: UploadFile = File(...),
 	session: str = Form(default="web-" + uuid.uuid4().hex),
 	lang: str = Form(default="hi"),
@@ -253,39 +250,24 @@ async def direct_stt_llm_tts(
 		f.write(await audio.read())
 
 	try:
-		# Transcribe
 		# Note: faster-whisper supports multiple formats; webm/ogg should work if ffmpeg is available
-		user_text = ""
-		from .stt import transcribe_file  # local import to avoid circular import at module load
 		try:
-			user_text = transcribe_file(tmp_path, language=lang)
-		except Exception:
-			user_text = ""
-
-		if not user_text:
+			turn = await run_turn(
+				session,
+				lambda: transcribe_file(tmp_path, language=lang),
+				fallback_reply="Namaste! Thodi der baad phir se koshish karte hain.",
+				audio_profile=negotiate_profile(request.headers.get("accept"), default=settings.browser_audio_profile),
+				is_disconnected=request.is_disconnected,
+			)
+		except TurnCancelled:
+			return JSONResponse({"error": "Client disconnected"}, status_code=499)
+
+		if not turn.user_text:
 			return JSONResponse({"error": "No speech detected"}, status_code=400)
-
-		# Memory + LLM
-		history = load_history(session)
-		append_message(session, "user", user_text)
-		try:
-			reply_text = generate_response(history + [{"role": "user", "content": user_text}])
-		except Exception:
-			reply_text = "Namaste! Thodi der baad phir se koshish karte hain."
-		append_message(session, "assistant", reply_text)
-
-		# TTS
-		try:
-			import logging
-			logger = logging.getLogger(__name__)
-			logger.info(f"TTS provider: {settings.tts_provider}, generating audio for: {reply_text[:50]}...")
-			audio_path = await synthesize(reply_text)
-		except Exception as exc:
-			import logging
-			logging.getLogger(__name__).error(f"TTS failed, using text fallback: {exc}")
+		if not turn.audio_path:
 			# Fallback to returning text so the client can use Web Speech API
-			return JSONResponse({"text": reply_text, "note": "tts_failed"}, status_code=200)
-		return FileResponse(audio_path, media_type="audio/mpeg")
+			return JSONResponse({"text": turn.reply_text, "note": "tts_failed"}, status_code=200)
+		return FileResponse(turn.audio_path, media_type=media_type_for(turn.audio_path))
 	finally:
 		try:
 			os.remove(tmp_path)
@@ -302,6 +284,7 @@ async def direct_stream(ws: WebSocket):
 	await ws.accept()
 	session_id: str | None = None
 	lang = "hi"
+	audio_profile = settings.browser_audio_profile
 	try:
 		while True:
 			msg = await ws.receive_json()
@@ -309,6 +292,8 @@ async def direct_stream(ws: WebSocket):
 			if mtype == "start":
 				session_id = msg.get("session") or f"ws-{uuid.uuid4().hex}"
 				lang = msg.get("lang") or "hi"
+				# Browsers can't set headers on a WebSocket, so the Accept value comes in the start message
+				audio_profile = negotiate_profile(msg.get("accept") or ws.headers.get("accept"), default=settings.browser_audio_profile)
 				_session_partials[session_id] = []
 				await ws.send_json({"type": "ready", "session": session_id})
 			elif mtype == "audio":
@@ -323,7 +308,6 @@ async def direct_stream(ws: WebSocket):
 					tf.write(data)
 					tmp_path = tf.name
 				try:
-					from .stt import transcribe_file  # lazy import
 					import logging
 					logging.getLogger(__name__).debug(f"Transcribing chunk: {len(data)} bytes")
 					text = transcribe_file(tmp_path, language=lang)
@@ -351,26 +335,17 @@ async def direct_stream(ws: WebSocket):
 					await ws.send_json({"type": "info", "message": "no_speech"})
 					continue
 				await ws.send_json({"type": "info", "message": "processing"})
-				# Build response with memory
-				history = load_history(session_id)
-				append_message(session_id, "user", all_text)
-				try:
-					reply_text = generate_response(history + [{"role": "user", "content": all_text}])
-				except Exception:
-					reply_text = "Namaste! Thodi der baad phir se koshish karte hain."
-				append_message(session_id, "assistant", reply_text)
-				# TTS or text fallback
-				try:
-					import logging
-					logger = logging.getLogger(__name__)
-					logger.info(f"TTS provider: {settings.tts_provider}, generating audio for: {reply_text[:50]}...")
-					audio_path = await synthesize(reply_text)
-					filename = os.path.basename(audio_path)
-					await ws.send_json({"type": "reply_audio_url", "url": f"/media/{filename}", "text": reply_text})
-				except Exception as e:
-					import logging
-					logging.getLogger(__name__).error(f"TTS failed, using text fallback: {e}")
-					await ws.send_json({"type": "reply_text", "text": reply_text})
+				turn = await run_turn(
+					session_id,
+					all_text,
+					fallback_reply="Namaste! Thodi der baad phir se koshish karte hain.",
+					audio_profile=audio_profile,
+				)
+				if turn.audio_path:
+					filename = os.path.basename(turn.audio_path)
+					await ws.send_json({"type": "reply_audio_url", "url": f"/media/{filename}", "text": turn.reply_text})
+				else:
+					await ws.send_json({"type": "reply_text", "text": turn.reply_text})
 			elif mtype == "stop":
 				break
 	except WebSocketDisconnect:
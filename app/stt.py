@@ -1,5 +1,6 @@
 import os
 import tempfile
+import threading
 import uuid
 from typing import Optional
 
@@ -11,16 +12,20 @@ from .config import get_settings
 
 settings = get_settings()
 _model: WhisperModel | None = None
+# Turns transcribe in worker threads; only one of them may build the model
+_model_lock = threading.Lock()
 
 
 def _get_model() -> WhisperModel:
 	global _model
 	if _model is None:
-		_model = WhisperModel(
-			settings.whisper_model,
-			device="auto",
-			compute_type=settings.whisper_compute_type,
-		)
+		with _model_lock:
+			if _model is None:
+				_model = WhisperModel(
+					settings.whisper_model,
+					device="auto",
+					compute_type=settings.whisper_compute_type,
+				)
 	return _model
 
 
@@ -1,6 +1,9 @@
 import asyncio
+import io
+import logging
 import os
 import uuid
+from dataclasses import dataclass
 from typing import Literal
 
 import edge_tts
@@ -10,6 +13,7 @@ from .config import get_settings
 
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 
 async def synthesize_edge(text: str, voice: str | None = None) -> str:
@@ -73,3 +77,114 @@ async def synthesize(text: str) -> str:
 	return await synthesize_edge(text)
 
 
+@dataclass(frozen=True)
+class AudioProfile:
+	suffix: str
+	media_type: str
+	container: str | None = None
+	codec: str | None = None
+	sample_rate: int | None = None
+	bit_rate: int | None = None
+
+
+AUDIO_PROFILES: dict[str, AudioProfile] = {
+	# What the TTS providers return; no transcoding
+	"mp3": AudioProfile(suffix=".mp3", media_type="audio/mpeg"),
+	# 8 kHz mono mu-law, the native format of the phone line
+	"telephony": AudioProfile(suffix=".ulaw.wav", media_type="audio/wav", container="wav", codec="pcm_mulaw", sample_rate=8000),
+	# Low-bitrate speech Opus for browsers
+	"opus": AudioProfile(suffix=".opus.webm", media_type="audio/webm", container="webm", codec="libopus", sample_rate=48000, bit_rate=24000),
+}
+
+_ACCEPT_TYPES: dict[str, str] = {
+	"audio/mpeg": "mp3",
+	"audio/mp3": "mp3",
+	"audio/webm": "opus",
+	"audio/opus": "opus",
+	"audio/wav": "telephony",
+	"audio/x-wav": "telephony",
+	"audio/basic": "telephony",
+	"audio/pcmu": "telephony",
+}
+
+
+def negotiate_profile(accept: str | None, default: str = "mp3") -> str:
+	"""Pick the audio profile for an Accept header, falling back to `default`."""
+	best, best_q = default, 0.0
+	for item in (accept or "").split(","):
+		parts = [p.strip() for p in item.split(";")]
+		media = parts[0].lower()
+		q = 1.0
+		for param in parts[1:]:
+			if param.startswith("q="):
+				try:
+					q = float(param[2:])
+				except ValueError:
+					q = 0.0
+		profile = _ACCEPT_TYPES.get(media)
+		if profile and q > best_q:
+			best, best_q = profile, q
+	return best
+
+
+def media_type_for(path: str) -> str:
+	for profile in AUDIO_PROFILES.values():
+		if profile.container and path.endswith(profile.suffix):
+			return profile.media_type
+	return "audio/mpeg"
+
+
+def _transcode(data: bytes, profile: AudioProfile) -> bytes:
+	import av
+
+	out_buf = io.BytesIO()
+	with av.open(io.BytesIO(data), mode="r") as src, av.open(out_buf, mode="w", format=profile.container) as dst:
+		stream = dst.add_stream(profile.codec, rate=profile.sample_rate)
+		stream.layout = "mono"
+		if profile.bit_rate:
+			stream.bit_rate = profile.bit_rate
+		resampler = av.AudioResampler(format="s16", layout="mono", rate=profile.sample_rate)
+		for frame in src.decode(audio=0):
+			frame.pts = None
+			for resampled in resampler.resample(frame):
+				for packet in stream.encode(resampled):
+					dst.mux(packet)
+		for resampled in resampler.resample(None):
+			for packet in stream.encode(resampled):
+				dst.mux(packet)
+		for packet in stream.encode(None):
+			dst.mux(packet)
+	return out_buf.getvalue()
+
+
+async def render_variant(audio_path: str, profile_name: str) -> str:
+	"""Return `audio_path` in the given profile, transcoding once and keeping the result next to it.
+
+	The MP3 is kept on purpose: cached replies point at it, and it is the
+	source for any other profile a later caller asks for. Falls back to the
+	original MP3 if the profile is unknown or transcoding fails.
+	"""
+	profile = AUDIO_PROFILES.get(profile_name)
+	if profile is None or profile.container is None:
+		return audio_path
+	base, _ = os.path.splitext(audio_path)
+	variant_path = base + profile.suffix
+	if os.path.exists(variant_path):
+		return variant_path
+	tmp_path = f"{variant_path}.{uuid.uuid4().hex}.tmp"
+	try:
+		with open(audio_path, "rb") as f:
+			data = f.read()
+		encoded = await asyncio.to_thread(_transcode, data, profile)
+		with open(tmp_path, "wb") as f:
+			f.write(encoded)
+		os.replace(tmp_path, variant_path)
+	except Exception as e:
+		logger.error(f"Transcoding {audio_path} to {profile_name} failed, serving MP3: {e}")
+		try:
+			os.remove(tmp_path)
+		except Exception:
+			pass
+		return audio_path
+	logger.info(f"Rendered {profile_name} variant: {os.path.basename(variant_path)} ({len(data)} -> {len(encoded)} bytes)")
+	return variant_path
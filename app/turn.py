@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List
+
+from .cache import CachedReply, cached_generate_response, remember_audio, response_cache
+from .config import get_settings
+from .llm import generate_response
+from .memory import load_history, append_message
+from .tts import synthesize, render_variant
+
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Fire-and-forget work (memory writes, cache updates); referenced so it isn't garbage collected
+_background_tasks: set[asyncio.Task] = set()
+# Last pending memory write per session, so the next turn's history load sees it
+_pending_writes: Dict[str, asyncio.Task] = {}
+
+
+class TurnCancelled(Exception):
+	"""Raised when the client disconnects before the turn completes."""
+
+
+@dataclass
+class TurnResult:
+	user_text: str = ""
+	reply_text: str = ""
+	audio_path: str | None = None
+	timings: Dict[str, float] = field(default_factory=dict)
+
+
+def _spawn(coro: Awaitable) -> asyncio.Task:
+	task = asyncio.ensure_future(coro)
+	_background_tasks.add(task)
+	task.add_done_callback(_background_tasks.discard)
+	return task
+
+
+async def _timed(result: TurnResult, stage: str, coro: Awaitable, timeout: float):
+	started = time.perf_counter()
+	try:
+		return await asyncio.wait_for(coro, timeout)
+	finally:
+		result.timings[stage] = round((time.perf_counter() - started) * 1000, 1)
+
+
+async def _load_history(session_id: str) -> List[Dict[str, str]]:
+	pending = _pending_writes.get(session_id)
+	if pending is not None and not pending.done():
+		await asyncio.shield(pending)
+	return await asyncio.to_thread(load_history, session_id)
+
+
+async def _persist_turn(session_id: str, user_text: str, reply_text: str) -> None:
+	try:
+		await asyncio.to_thread(append_message, session_id, "user", user_text)
+		await asyncio.to_thread(append_message, session_id, "assistant", reply_text)
+	except Exception as e:
+		logger.error(f"Memory write failed for session {session_id}: {e}")
+
+
+def _schedule_persist(session_id: str, user_text: str, reply_text: str) -> None:
+	task = _spawn(_persist_turn(session_id, user_text, reply_text))
+	_pending_writes[session_id] = task
+
+	def _clear(t: asyncio.Task) -> None:
+		if _pending_writes.get(session_id) is t:
+			_pending_writes.pop(session_id, None)
+
+	task.add_done_callback(_clear)
+
+
+async def _remember_audio(history: List[Dict[str, str]], user_text: str, reply_text: str, audio_path: str) -> None:
+	try:
+		await asyncio.to_thread(remember_audio, history, user_text, reply_text, audio_path)
+	except Exception as e:
+		logger.warning(f"Caching rendered audio failed: {e}")
+
+
+async def _pipeline(
+	result: TurnResult,
+	session_id: str,
+	transcribe: str | Callable[[], str],
+	fallback_reply: str,
+	audio_profile: str,
+) -> TurnResult:
+	# History does not depend on the transcript, so load it while STT runs
+	history_task = asyncio.ensure_future(
+		_timed(result, "history", _load_history(session_id), settings.history_timeout_seconds)
+	)
+	try:
+		if isinstance(transcribe, str):
+			result.user_text = transcribe.strip()
+		else:
+			try:
+				result.user_text = (await _timed(result, "stt", asyncio.to_thread(transcribe), settings.stt_timeout_seconds) or "").strip()
+			except Exception as e:
+				logger.error(f"STT stage failed for session {session_id}: {e}")
+				result.user_text = ""
+		if not result.user_text:
+			return result
+
+		history_ok = True
+		try:
+			history = await history_task
+		except Exception as e:
+			logger.error(f"History load failed for session {session_id}: {e}")
+			logger.warning(f"Replying to session {session_id} without conversation history")
+			history, history_ok = [], False
+	finally:
+		if not history_task.done():
+			history_task.cancel()
+
+	# LLM (cached for first turns; skip the cache if history is unknown)
+	cached_audio: str | None = None
+	try:
+		if history_ok:
+			llm_call = asyncio.to_thread(cached_generate_response, history, result.user_text)
+		else:
+			llm_call = asyncio.to_thread(
+				lambda: CachedReply(text=generate_response([{"role": "user", "content": result.user_text}]))
+			)
+		reply = await _timed(result, "llm", llm_call, settings.llm_timeout_seconds)
+		result.reply_text, cached_audio = reply.text, reply.audio_path
+	except Exception as e:
+		logger.error(f"LLM stage failed for session {session_id}: {e}")
+		result.reply_text = fallback_reply
+
+	# Memory writes are off the critical path
+	_schedule_persist(session_id, result.user_text, result.reply_text)
+
+	# TTS (cached replies reuse their rendered audio and its transcoded variants)
+	audio_path = cached_audio
+	if not audio_path:
+		try:
+			logger.info(f"TTS provider: {settings.tts_provider}, generating audio for: {result.reply_text[:50]}...")
+			audio_path = await _timed(result, "tts", synthesize(result.reply_text), settings.tts_timeout_seconds)
+		except Exception as e:
+			logger.error(f"TTS failed, using text fallback: {e}")
+			return result
+		# Baseline for the synthesis time saved by cache hits that carry audio
+		response_cache.record_synthesis(result.timings["tts"] / 1000)
+		if history_ok:
+			_spawn(_remember_audio(history, result.user_text, result.reply_text, audio_path))
+	try:
+		result.audio_path = await _timed(result, "transcode", render_variant(audio_path, audio_profile), settings.transcode_timeout_seconds)
+	except Exception as e:
+		logger.error(f"Transcoding to {audio_profile} failed, serving MP3: {e}")
+		result.audio_path = audio_path
+	return result
+
+
+async def _watch_disconnect(is_disconnected: Callable[[], Awaitable[bool]]) -> None:
+	while not await is_disconnected():
+		await asyncio.sleep(settings.disconnect_poll_seconds)
+
+
+async def run_turn(
+	session_id: str,
+	transcribe: str | Callable[[], str],
+	fallback_reply: str,
+	audio_profile: str = "mp3",
+	is_disconnected: Callable[[], Awaitable[bool]] | None = None,
+) -> TurnResult:
+	"""Run one STT -> LLM -> TTS turn with history loading overlapped with STT.
+
+	`transcribe` is either the already-transcribed text or a blocking callable
+	producing it. The reply audio is rendered in `audio_profile` (see
+	tts.AUDIO_PROFILES). If `is_disconnected` reports the client gone, the turn is
+	cancelled and TurnCancelled is raised. An empty `user_text` on the result
+	means no speech was detected; a missing `audio_path` means TTS failed and
+	the caller should fall back to text.
+
+	Stage deadlines and cancellation abandon blocking STT/LLM calls rather than
+	stopping them: the worker thread runs to completion in the background.
+	"""
+	result = TurnResult()
+	pipeline = asyncio.ensure_future(_pipeline(result, session_id, transcribe, fallback_reply, audio_profile))
+	if is_disconnected is None:
+		result = await pipeline
+	else:
+		watcher = asyncio.ensure_future(_watch_disconnect(is_disconnected))
+		try:
+			await asyncio.wait({pipeline, watcher}, return_when=asyncio.FIRST_COMPLETED)
+			if not pipeline.done() and watcher.exception() is None:
+				pipeline.cancel()
+				logger.info(f"Client disconnected, cancelled turn for session {session_id}")
+				raise TurnCancelled(session_id)
+			result = await pipeline
+		except asyncio.CancelledError:
+			pipeline.cancel()
+			raise
+		finally:
+			watcher.cancel()
+	logger.info(f"Turn timings for session {session_id}: {result.timings}")
+	return result